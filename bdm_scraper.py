@@ -1,11 +1,43 @@
+"""
+Scraper d'articles du Blog du Modérateur avec stockage dans MongoDB.
+
+La durabilité des écritures est relâchée (w=1, pas d'attente du journal):
+un article perdu peut simplement être re-scrapé. Les écritures restent
+acquittées, pour que les erreurs remontent et que urls_connues() ne
+contienne que des articles réellement sauvegardés.
+
+Le client MongoDB est créé à l'import et n'est pas fork-safe: un crawler
+multi-processus doit importer ce module dans chaque processus fils (ou y
+créer son propre MongoClient à partir de MONGO_URI) plutôt qu'hériter du
+client du parent.
+
+Les échanges avec MongoDB ne sont pas compressés. Pour l'activer, installer
+pymongo[zstd,snappy] et ajouter compressors="zstd,snappy" au MongoClient.
+"""
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re
+from functools import lru_cache
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin
-from datetime import datetime
-from dateutil import parser as dateutil_parser
-from pymongo import MongoClient, ASCENDING
+import lxml.html
+from lxml import etree
+from urllib.parse import urljoin, urlsplit
+from datetime import datetime, timezone
+from pymongo import MongoClient, ASCENDING, DESCENDING, TEXT, UpdateOne
+from pymongo.collation import Collation
+from pymongo.results import UpdateResult
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
+from itertools import chain
+
+try:
+    import aiohttp
+except ImportError:  # optionnel, seulement utilisé par scraper_articles_async
+    aiohttp = None
 
 # Configuration de la base de données
 MONGO_URI = "mongodb://localhost:27017/"
@@ -13,10 +45,191 @@ DB_NAME = "bdm_db"
 COLLECTION = "articles"
 
 # Connexion à MongoDB
-client = MongoClient(MONGO_URI)
+client = MongoClient(
+    MONGO_URI,
+    maxPoolSize=64,  # assez pour scraper_articles_batch / scraper_articles_async
+    minPoolSize=8,
+    w=1,
+    journal=False,
+    retryWrites=True,
+    socketTimeoutMS=10000,
+)
 db = client[DB_NAME]
 articles_col = db[COLLECTION]
-articles_col.create_index([("url", ASCENDING)], unique=True, sparse=True)
+
+# Comparaison insensible à la casse (strength=2) pour les requêtes sur les catégories
+COLLATION_FR = Collation(locale="fr", strength=2)
+
+# Index créés au premier accès à la base (voir creer_index), pas à l'import
+_index_crees = False
+_verrou_index = threading.Lock()
+
+# Champs volumineux exclus par défaut des résultats de recherche
+PROJECTION_LEGERE = {"content": 0, "images": 0}
+
+# URLs déjà en base, chargées au premier besoin (voir urls_connues)
+_urls_connues = None
+_verrou_urls = threading.Lock()
+
+# Session HTTP partagée: les connexions keep-alive sont réutilisées d'un article à l'autre
+# Accept-Encoding n'est pas fixé: requests et aiohttp annoncent déjà gzip/deflate,
+# et br seulement si un décodeur brotli est installé
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "fr,en;q=0.5",
+}
+
+def creer_session():
+    """Crée une session HTTP avec pool de connexions keep-alive et relances"""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    # pool_connections = nombre d'hôtes gardés en cache, pool_maxsize = connexions par hôte
+    adaptateur = HTTPAdapter(pool_connections=16, pool_maxsize=64,
+                             max_retries=Retry(total=2, backoff_factor=0.3))
+    session.mount("https://", adaptateur)
+    session.mount("http://", adaptateur)
+    return session
+
+SESSION = creer_session()
+
+# Une session par thread pour les scrapes en parallèle (requests.Session n'est pas thread-safe)
+_sessions_threads = threading.local()
+
+# Au-delà, le corps de la page est tronqué (vidéos, commentaires... gonflent certaines pages)
+TAILLE_MAX_PAGE = 2 * 1024 * 1024
+TAILLE_MORCEAU = 64 * 1024
+
+# Expressions régulières compilées une seule fois au chargement du module
+FRENCH_DATE_RE = re.compile(r'(\d{1,2})\s+([^\s,]+)\s+(\d{4})', re.IGNORECASE)
+ISO_DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+# Dates numériques séparées par "/", "." ou "-" (le même séparateur des deux côtés)
+DMY_SLASH_RE = re.compile(r'(\d{1,2})([./-])(\d{1,2})\2(\d{4})')
+YMD_SLASH_RE = re.compile(r'(\d{4})([./-])(\d{1,2})\2(\d{1,2})')
+PUB_RE = re.compile(
+    r'Publié\s+le?\s+([^|]+)'
+    r'|Published\s+on\s+([^|]+)'
+    r'|(\d{1,2}\s+(?:janvier|février|fevrier|mars|avril|mai|juin|juillet|août|aout'
+    r'|septembre|octobre|novembre|décembre|decembre)\s+\d{4})'
+    r'|(\d{4}-\d{2}-\d{2})',
+    re.IGNORECASE
+)
+
+# Espaces spéciaux (insécable, espaces typographiques, séparateurs) ramenés à un espace simple
+WS_TABLE = {c: ord(' ') for c in (0xA0, 0x2028, 0x2029, *range(0x2000, 0x200C))}
+
+BALISES_TEXTE = frozenset(['p', 'h2', 'h3', 'h4', 'h5', 'h6'])
+
+# Expressions XPath compilées une seule fois. Les tests "insensibles à la casse" passent par
+# translate() + contains(), évalués en C (les regex EXSLT rappellent Python à chaque nœud)
+_MINUSCULES = '"ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"'
+_CLASSE = f'translate(@class, {_MINUSCULES})'
+XP_META_PROPERTY = etree.XPath('string((//meta[@property=$nom])[1]/@content)')
+XP_META_NAME = etree.XPath('string((//meta[@name=$nom])[1]/@content)')
+XP_PREMIER_H1 = etree.XPath('(//h1)[1]')
+XP_PREMIER_TIME = etree.XPath('(//time)[1]')
+XP_TITRES_SOMMAIRE = etree.XPath(f'(//h2 | //h3 | //h4)[contains(translate(., {_MINUSCULES}), "sommaire")]')
+# Repli sur les div: seul leur texte direct est testé, pas celui de tous leurs descendants
+XP_DIVS_SOMMAIRE = etree.XPath(f'//div[text()[contains(translate(., {_MINUSCULES}), "sommaire")]]')
+# Première liste après le début du titre, y compris dans le titre lui-même
+# (<div>Sommaire<ul>...</ul></div>): les descendants précèdent "following" dans l'ordre du document
+XP_LISTE_SUIVANTE = etree.XPath('(descendant::* | following::*)[self::ol or self::ul][1]')
+XP_BREADCRUMB = etree.XPath(f'(//nav | //div)[contains({_CLASSE}, "breadcrumb")][1]')
+XP_RESUME = etree.XPath(f'(//p | //div)[contains({_CLASSE}, "chapo") or contains({_CLASSE}, "lead")'
+                        f' or contains({_CLASSE}, "intro") or contains({_CLASSE}, "excerpt")][1]')
+XP_LIEN_AUTEUR = etree.XPath('(//a[contains(concat(" ", normalize-space(@rel), " "), " author ")])[1]')
+XP_AUTEUR_CLASSE = etree.XPath(f'(//span | //div)[contains({_CLASSE}, "author")][1]')
+XP_PREMIERS_PARAGRAPHES = etree.XPath('(.//p)[position() <= 5]')
+# Div/span portant du texte direct (lignes de signature "Publié le ..." hors <header>)
+XP_PREMIERS_DIVS_SPANS = etree.XPath('(.//div | .//span)[text()[normalize-space()]][position() <= 10]')
+XP_TEXTES_DIRECTS = etree.XPath('text()')
+XP_DANS_NAV = etree.XPath('boolean(ancestor::nav or ancestor::aside)')
+
+_MOIS = {
+    'janvier': '01', 'février': '02', 'fevrier': '02', 'mars': '03', 
+    'avril': '04', 'mai': '05', 'juin': '06', 'juillet': '07', 
+    'août': '08', 'aout': '08', 'septembre': '09', 'octobre': '10', 
+    'novembre': '11', 'décembre': '12', 'decembre': '12'
+}
+# Variantes "mars", "Mars" et "MARS" déjà présentes: pas de .lower() dans le cas courant
+MOIS_FRANCAIS = {variante: numero for mois, numero in _MOIS.items()
+                 for variante in (mois, mois.capitalize(), mois.upper())}
+
+# Pour la lecture mot par mot: noms sans accents, abréviations et mois anglais
+SANS_ACCENTS = str.maketrans("éèêëàâäîïôöûüùç", "eeeeaaaiioouuuc")
+MOIS_MOTS = {mois.translate(SANS_ACCENTS): numero for mois, numero in _MOIS.items()}
+MOIS_MOTS.update({
+    'janv': '01', 'fevr': '02', 'avr': '04', 'juil': '07', 'sept': '09',
+    'oct': '10', 'nov': '11', 'dec': '12',
+    'january': '01', 'february': '02', 'march': '03', 'april': '04', 'may': '05',
+    'june': '06', 'july': '07', 'august': '08', 'september': '09', 'october': '10',
+    'november': '11', 'december': '12',
+    'jan': '01', 'feb': '02', 'apr': '04', 'jun': '06', 'jul': '07',
+    'aug': '08', 'sep': '09',
+})
+
+#-------------------------------------------------------------------------------------------------------------------
+
+def creer_index():
+    """
+    Crée les index de la collection, une seule fois par processus
+    Appelée avant les sauvegardes et les recherches: importer le module (pour le
+    parseur seul, par exemple) ne contacte pas MongoDB
+    """
+    global _index_crees
+    if _index_crees:
+        return
+    with _verrou_index:
+        if _index_crees:
+            return
+        articles_col.create_index([("url", ASCENDING)], unique=True, sparse=True)
+        articles_col.create_index([("subcategory", ASCENDING)], collation=COLLATION_FR)
+
+        # Index pour recherche_avancee, avec la même collation que les requêtes
+        # (date est une chaîne: le tri n'utilise l'index que si les collations correspondent)
+        articles_col.create_index([("date", DESCENDING), ("subcategory", ASCENDING)],
+                                  collation=COLLATION_FR, name="date_subcategory_fr")
+        articles_col.create_index([("author", ASCENDING), ("date", DESCENDING)],
+                                  collation=COLLATION_FR, name="author_date_fr")
+
+        # Index texte (index inversé, racinisation française) pour la recherche par mots-clés
+        articles_col.create_index([("title", TEXT), ("content", TEXT)], default_language="french")
+        _index_crees = True
+
+#-------------------------------------------------------------------------------------------------------------------
+
+def urls_connues():
+    """
+    Ensemble des URLs déjà sauvegardées, chargé depuis MongoDB au premier appel
+    puis tenu à jour par les sauvegardes de ce processus
+    """
+    global _urls_connues
+    if _urls_connues is None:
+        with _verrou_urls:
+            if _urls_connues is None:
+                curseur = articles_col.find({}, {"url": 1, "_id": 0})
+                _urls_connues = {doc["url"] for doc in curseur if doc.get("url")}
+    return _urls_connues
+
+#-------------------------------------------------------------------------------------------------------------------
+
+def url_deja_connue(url):
+    """
+    Indique si l'URL est déjà en base, y compris sous la forme qu'elle prend
+    après les redirections habituelles (http -> https, slash final):
+    c'est l'URL finale qui est sauvegardée
+    """
+    connues = urls_connues()
+    if url in connues:
+        return True
+
+    morceaux = urlsplit(url)
+    if morceaux.scheme == "http":
+        morceaux = morceaux._replace(scheme="https")
+    chemin = morceaux.path
+    autre_chemin = chemin[:-1] if chemin.endswith("/") else chemin + "/"
+    return (morceaux.geturl() in connues
+            or morceaux._replace(path=autre_chemin).geturl() in connues)
 
 #-------------------------------------------------------------------------------------------------------------------
 
@@ -24,9 +237,16 @@ def nettoyer_texte(texte):
     """Nettoie et normalise le texte"""
     if not texte:
         return ""
-    texte = re.sub(r'\s+', ' ', texte.strip())
-    texte = re.sub(r'[\u00A0\u2000-\u200B\u2028\u2029]', ' ', texte)
-    return texte.strip()
+    return ' '.join(texte.translate(WS_TABLE).split())
+
+#-------------------------------------------------------------------------------------------------------------------
+
+def en_entier(valeur):
+    """Convertit un attribut numérique ("300") en entier, None sinon ("100%", absent...)"""
+    if not valeur:
+        return None
+    valeur = valeur.strip()
+    return int(valeur) if valeur.isdecimal() else None
 
 #-------------------------------------------------------------------------------------------------------------------
 
@@ -47,109 +267,223 @@ def extraire_url_image(img_tag, base_url):
 
 #-------------------------------------------------------------------------------------------------------------------
 
+@lru_cache(maxsize=1024)
 def convertir_date_francaise(texte_date):
-    """Convertit une date française en format AAAAMMJJ"""
+    """
+    Convertit une date française en format AAAAMMJJ
+    Mise en cache: le même en-tête de date revient souvent d'un article à l'autre
+    """
     if not texte_date:
         return None
     
-    mois_francais = {
-        'janvier': '01', 'février': '02', 'fevrier': '02', 'mars': '03', 
-        'avril': '04', 'mai': '05', 'juin': '06', 'juillet': '07', 
-        'août': '08', 'aout': '08', 'septembre': '09', 'octobre': '10', 
-        'novembre': '11', 'décembre': '12', 'decembre': '12'
-    }
-    
     texte_date = texte_date.strip()
     
     # Cherche le format "jour mois année"
-    match = re.search(r'(\d{1,2})\s+([^\s,]+)\s+(\d{4})', texte_date, flags=re.IGNORECASE)
+    match = FRENCH_DATE_RE.search(texte_date)
     if match:
         jour = int(match.group(1))
-        nom_mois = match.group(2).lower()
+        nom_mois = match.group(2)
         annee = int(match.group(3))
-        numero_mois = mois_francais.get(nom_mois)
+        numero_mois = MOIS_FRANCAIS.get(nom_mois) or MOIS_FRANCAIS.get(nom_mois.lower())
         if numero_mois:
             return f"{annee:04d}{numero_mois}{jour:02d}"
     
     # Cherche le format ISO
-    iso_match = re.search(r'(\d{4})-(\d{2})-(\d{2})', texte_date)
+    iso_match = ISO_DATE_RE.search(texte_date)
     if iso_match:
         return f"{iso_match.group(1)}{iso_match.group(2)}{iso_match.group(3)}"
     
-    # Dernière tentative avec le parseur automatique
-    try:
-        dt = dateutil_parser.parse(texte_date, dayfirst=True, fuzzy=True)
-        return dt.strftime("%Y%m%d")
-    except:
+    # Cherche les formats "AAAA/MM/JJ" et "JJ/MM/AAAA" (ou "MM/JJ/AAAA" si le mois dépasse 12),
+    # aussi avec "." ou "-" ("15.03.2024", "15-03-2024")
+    ymd_match = YMD_SLASH_RE.search(texte_date)
+    if ymd_match:
+        annee, mois, jour = (int(g) for g in ymd_match.group(1, 3, 4))
+        if date_plausible(annee, mois, jour):
+            return f"{annee:04d}{mois:02d}{jour:02d}"
+    
+    dmy_match = DMY_SLASH_RE.search(texte_date)
+    if dmy_match:
+        jour, mois, annee = (int(g) for g in dmy_match.group(1, 3, 4))
+        if not date_plausible(annee, mois, jour):
+            jour, mois = mois, jour
+        if date_plausible(annee, mois, jour):
+            return f"{annee:04d}{mois:02d}{jour:02d}"
+    
+    # Dernière tentative mot par mot (réservée aux textes courts pour éviter les faux positifs)
+    if len(texte_date) >= 64:
         return None
+    return lire_date_mot_a_mot(texte_date)
 
 #-------------------------------------------------------------------------------------------------------------------
 
-def scraper_article_bdm(url, session=None, verbose=False):
+def lire_date_mot_a_mot(texte_date):
     """
-    Scrape un article du Blog du Modérateur
-    Retourne toutes les infos demandées dans le TP
+    Cherche un jour, un mois en lettres et une année parmi les mots du texte,
+    dans n'importe quel ordre ("1er janvier 2024", "March 3, 2024"...)
     """
-    if session is None:
-        session = requests.Session()
-    
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+    jour = numero_mois = annee = None
+    for mot in texte_date.lower().translate(SANS_ACCENTS).split():
+        mot = mot.strip(".,;:()")
+        if mot.endswith("er") and mot[:-2].isdecimal():  # "1er"
+            mot = mot[:-2]
+        if mot.isdecimal():
+            if len(mot) == 4 and annee is None:
+                annee = int(mot)
+            elif len(mot) <= 2 and jour is None and 1 <= int(mot) <= 31:
+                jour = int(mot)
+        elif numero_mois is None:
+            numero_mois = MOIS_MOTS.get(mot)
+
+        if jour and numero_mois and annee:
+            return f"{annee:04d}{numero_mois}{jour:02d}"
+    return None
+
+#-------------------------------------------------------------------------------------------------------------------
+
+def date_plausible(annee, mois, jour):
+    """Indique si annee/mois/jour est une vraie date (pas de 13e mois ni de 30 février)"""
+    try:
+        datetime(annee, mois, jour)
+    except ValueError:
+        return False
+    return True
+
+#-------------------------------------------------------------------------------------------------------------------
+
+def classe_contient(tag, sous_chaine):
+    """Indique si l'une des classes CSS de la balise contient sous_chaine (casse ignorée)"""
+    return any(sous_chaine in classe.lower() for classe in tag.get('class', ()))
+
+#-------------------------------------------------------------------------------------------------------------------
+
+def extraire_elements_article(article, hors_contenu=False):
+    """
+    Parcourt l'article une seule fois et range les balises utiles par type
+    (première image, zone de contenu, paragraphes/titres, images, légendes)
+    hors_contenu indique que l'article est lui-même dans un nav/aside
+    """
+    trouve = {
+        "img": None,
+        "zone": None,
+        "blocs": [],
+        "blocs_zone": [],
+        "images": [],
+        "images_zone": [],
+        "legendes": {},  # id(figure) -> premier figcaption de la figure
     }
-    
+
+    # Pile (balise, dans la zone de contenu, dans un nav/aside, figure parente)
+    pile = [(enfant, False, hors_contenu, None) for enfant in reversed(article.contents)]
+
+    while pile:
+        elem, dans_zone, dans_nav, figure = pile.pop()
+        nom = elem.name
+        if nom is None:  # texte, commentaire...
+            continue
+
+        if nom in BALISES_TEXTE:
+            if not dans_nav:
+                trouve["blocs"].append(elem)
+                if dans_zone:
+                    trouve["blocs_zone"].append(elem)
+        elif nom == 'img':
+            if trouve["img"] is None:
+                trouve["img"] = elem
+            trouve["images"].append((elem, figure))
+            if dans_zone:
+                trouve["images_zone"].append((elem, figure))
+        elif nom == 'div':
+            if trouve["zone"] is None and classe_contient(elem, 'content'):
+                trouve["zone"] = elem
+                dans_zone = True
+        elif nom == 'figure':
+            figure = elem
+        elif nom == 'figcaption':
+            if figure is not None:
+                trouve["legendes"].setdefault(id(figure), elem)
+        elif nom in ('nav', 'aside'):
+            dans_nav = True
+
+        pile.extend((enfant, dans_zone, dans_nav, figure) for enfant in reversed(elem.contents))
+
+    return trouve
+
+#-------------------------------------------------------------------------------------------------------------------
+
+def construire_arbre(contenu, encodage=None):
+    """Parse le HTML avec lxml; retourne None si la page est vide"""
+    parser = None
+    if encodage:
+        try:
+            parser = lxml.html.HTMLParser(encoding=encodage)
+        except LookupError:  # encodage inconnu: lxml lira le <meta charset>
+            parser = None
     try:
-        response = session.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-    except requests.RequestException as e:
+        arbre = lxml.html.document_fromstring(contenu, parser=parser)
+    except etree.ParserError:
+        return None
+
+    # Le contenu des scripts et styles ne doit pas apparaître dans les textes extraits
+    etree.strip_elements(arbre, "script", "style", with_tail=False)
+    return arbre
+
+#-------------------------------------------------------------------------------------------------------------------
+
+def analyser_article_bdm(contenu, base_url, encodage=None, verbose=False):
+    """
+    Extrait les infos d'un article du Blog du Modérateur à partir de son HTML
+    (contenu en octets, déjà téléchargé)
+    """
+    # Un seul parsing, en C: les champs simples sont lus en XPath sur l'arbre lxml
+    arbre = construire_arbre(contenu, encodage)
+    if arbre is None:
         if verbose:
-            print(f"Impossible de charger {url}: {e}")
+            print(f"Page vide: {base_url}")
         return None
-    
-    base_url = response.url
-    soup = BeautifulSoup(response.text, "html.parser")
 
-    for script in soup(["script", "style"]):
-        script.decompose()
+    article_el = arbre.find(".//article")
+    if article_el is None:
+        article_el = arbre.find(".//main")
+    if article_el is None:
+        article_el = arbre.find(".//body")
 
-    article = soup.find("article")
-    if not article:
-        article = soup.find("main")
-    if not article:
-        article = soup.find("body")
+    # BeautifulSoup seulement pour la zone de l'article (contenu et images)
+    trouve = None
+    if article_el is not None:
+        html_article = lxml.html.tostring(article_el, encoding="unicode", with_tail=False)
+        article = BeautifulSoup(html_article, "lxml").find(article_el.tag)
+        if article:
+            trouve = extraire_elements_article(article, XP_DANS_NAV(article_el))
 
     # 1. TITRE
     titre = None
-    h1 = soup.find('h1')
+    h1 = XP_PREMIER_H1(arbre)
     if h1:
-        titre = nettoyer_texte(h1.get_text())
+        titre = nettoyer_texte(h1[0].text_content())
     
     if not titre:
-        meta_title = soup.find("meta", property="og:title")
-        if meta_title:
-            titre = nettoyer_texte(meta_title.get("content"))
+        titre = nettoyer_texte(XP_META_PROPERTY(arbre, nom="og:title"))
 
     # 2. IMAGE MINIATURE
     thumbnail = None
-    meta_og = soup.find("meta", property="og:image")
-    if meta_og and meta_og.get("content"):
-        thumbnail = urljoin(base_url, meta_og["content"])
+    og_image = XP_META_PROPERTY(arbre, nom="og:image")
+    if og_image:
+        thumbnail = urljoin(base_url, og_image)
     
-    if not thumbnail and article:
-        img_principale = article.find("img")
+    if not thumbnail and trouve:
+        img_principale = trouve["img"]
         if img_principale:
             thumbnail = extraire_url_image(img_principale, base_url)
 
     # 3. SOMMAIRE
     sommaire = []
     # Chercher un titre "Sommaire" suivi d'une liste
-    titres_sommaire = soup.find_all(lambda tag: tag.name in ['h2', 'h3', 'div'] 
-                                   and 'sommaire' in tag.get_text().lower())
-    
+    titres_sommaire = XP_TITRES_SOMMAIRE(arbre) or XP_DIVS_SOMMAIRE(arbre)
     for titre_som in titres_sommaire:
-        liste = titre_som.find_next(['ol', 'ul'])
+        liste = XP_LISTE_SUIVANTE(titre_som)
         if liste:
-            for item in liste.find_all('li'):
-                texte = nettoyer_texte(item.get_text())
+            for item in liste[0].iter('li'):
+                texte = nettoyer_texte(item.text_content())
                 if texte and len(texte) > 2:
                     sommaire.append(texte)
             break
@@ -158,45 +492,52 @@ def scraper_article_bdm(url, session=None, verbose=False):
     sous_categorie = None
 
     # Chercher dans les breadcrumbs recup pas tout compris
-    breadcrumb = soup.find(['nav', 'div'], class_=re.compile(r'breadcrumb', re.I))
+    breadcrumb = XP_BREADCRUMB(arbre)
     if breadcrumb:
-        liens = breadcrumb.find_all('a')
+        liens = breadcrumb[0].findall('.//a')
         if len(liens) >= 2:
-            sous_categorie = nettoyer_texte(liens[-2].get_text())
+            sous_categorie = nettoyer_texte(liens[-2].text_content())
     
     # Alternative: meta article:section
     if not sous_categorie:
-        meta_section = soup.find("meta", {"name": "article:section"})
-        if meta_section:
-            sous_categorie = nettoyer_texte(meta_section.get("content"))
+        sous_categorie = nettoyer_texte(XP_META_NAME(arbre, nom="article:section"))
 
     # 5. RÉSUMÉ/CHAPÔ
     resume = None
     # Chercher les éléments avec des classes typiques de résumé
-    resume_elem = soup.find(['p', 'div'], class_=re.compile(r'(chapo|lead|intro|excerpt)', re.I))
+    resume_elem = XP_RESUME(arbre)
     if resume_elem:
-        resume = nettoyer_texte(resume_elem.get_text())
+        resume = nettoyer_texte(resume_elem[0].text_content())
     
     # Alternative: meta description
     if not resume:
-        meta_desc = soup.find("meta", {"name": "description"})
-        if meta_desc:
-            resume = nettoyer_texte(meta_desc.get("content"))
+        resume = nettoyer_texte(XP_META_NAME(arbre, nom="description"))
 
     # 6. DATE DE PUBLICATION
     date_aaaammjj = None
     texte_date = None
     
     # Chercher l'élément time
-    time_tag = soup.find('time')
+    time_tag = XP_PREMIER_TIME(arbre)
     if time_tag:
-        texte_date = time_tag.get('datetime') or nettoyer_texte(time_tag.get_text())
+        texte_date = time_tag[0].get('datetime') or nettoyer_texte(time_tag[0].text_content())
     
-    # Chercher "Publié le..."
+    # Alternative: meta article:published_time
     if not texte_date:
-        pub_match = re.search(r'Publié\s+le?\s+([^|]+)', soup.get_text(), re.I)
-        if pub_match:
-            texte_date = pub_match.group(1)
+        texte_date = XP_META_PROPERTY(arbre, nom="article:published_time")
+    
+    # Chercher "Publié le..." dans l'en-tête de l'article (pas dans toute la page)
+    if not texte_date and article_el is not None:
+        zones = [article_el.find('.//header')] + XP_PREMIERS_PARAGRAPHES(article_el)
+        textes = (zone.text_content() for zone in zones if zone is not None)
+        # Puis le texte direct des premiers div/span (signature de l'article)
+        signatures = (' '.join(XP_TEXTES_DIRECTS(elem)) for elem in XP_PREMIERS_DIVS_SPANS(article_el))
+        for texte in chain(textes, signatures):
+            # Zone par zone: on s'arrête à la première date trouvée
+            pub_match = PUB_RE.search(texte)
+            if pub_match:
+                texte_date = next(groupe for groupe in pub_match.groups() if groupe)
+                break
     
     if texte_date:
         date_aaaammjj = convertir_date_francaise(texte_date)
@@ -204,67 +545,54 @@ def scraper_article_bdm(url, session=None, verbose=False):
     # 7. AUTEUR
     auteur = None
     # Chercher les liens avec rel="author"
-    lien_auteur = soup.find('a', rel='author')
+    lien_auteur = XP_LIEN_AUTEUR(arbre)
     if lien_auteur:
-        auteur = nettoyer_texte(lien_auteur.get_text())
+        auteur = nettoyer_texte(lien_auteur[0].text_content())
     
     # Alternative: chercher les classes "author"
     if not auteur:
-        elem_auteur = soup.find(['span', 'div'], class_=re.compile(r'author', re.I))
+        elem_auteur = XP_AUTEUR_CLASSE(arbre)
         if elem_auteur:
-            auteur = nettoyer_texte(elem_auteur.get_text())
+            auteur = nettoyer_texte(elem_auteur[0].text_content())
 
     # 8. CONTENU DE L'ARTICLE
     contenu_texte = ""
-    if article:
-        # Trouver la zone de contenu principal
-        zone_contenu = article.find(['div'], class_=re.compile(r'(content|post-content)', re.I))
-        if not zone_contenu:
-            zone_contenu = article
-        
-        # Extraire les paragraphes et titres
+    if trouve:
+        # Paragraphes et titres de la zone de contenu principal (hors nav/aside)
+        blocs = trouve["blocs_zone"] if trouve["zone"] else trouve["blocs"]
+
         paragraphes = []
-        for elem in zone_contenu.find_all(['p', 'h2', 'h3', 'h4', 'h5', 'h6']):
-            # Ignorer les éléments de navigation ou publicité
-            if elem.find_parent(['nav', 'aside']):
-                continue
-            
+        for elem in blocs:
             texte = nettoyer_texte(elem.get_text())
             if texte and len(texte) > 10:
-                if elem.name.startswith('h'):
-                    paragraphes.append(f"\n{texte}\n")  # Espacer les titres
-                else:
-                    paragraphes.append(texte)
+                paragraphes.append(texte)
         
-        contenu_texte = "\n\n".join(paragraphes).strip()
-        contenu_texte = re.sub(r'\n{3,}', '\n\n', contenu_texte)  # Nettoyer les sauts de ligne
+        # Titres et paragraphes séparés par une ligne vide (nettoyer_texte ne laisse aucun \n)
+        contenu_texte = "\n\n".join(paragraphes)
 
     # 9. IMAGES DE L'ARTICLE
     images = []
-    if article:
-        zone_contenu = article.find(['div'], class_=re.compile(r'content', re.I)) or article
-        
-        for img in zone_contenu.find_all('img'):
+    # Éviter les doublons (variantes srcset, thumbnail répété)
+    deja_vues = {thumbnail} if thumbnail else set()
+    if trouve:
+        images_article = trouve["images_zone"] if trouve["zone"] else trouve["images"]
+
+        for img, parent_figure in images_article:
             url_img = extraire_url_image(img, base_url)
-            if not url_img:
+            if not url_img or url_img in deja_vues:
                 continue
             
             # Ignorer les petites images (probablement des icônes)
-            largeur = img.get('width')
-            hauteur = img.get('height')
-            if largeur and hauteur:
-                try:
-                    if int(largeur) < 100 or int(hauteur) < 100:
-                        continue
-                except:
-                    pass
+            largeur = en_entier(img.get('width'))
+            hauteur = en_entier(img.get('height'))
+            if largeur is not None and hauteur is not None and (largeur < 100 or hauteur < 100):
+                continue
             
             # Récupérer la légende
             legende = None
             # Chercher dans figcaption
-            parent_figure = img.find_parent('figure')
             if parent_figure:
-                figcaption = parent_figure.find('figcaption')
+                figcaption = trouve["legendes"].get(id(parent_figure))
                 if figcaption:
                     legende = nettoyer_texte(figcaption.get_text())
             
@@ -272,12 +600,11 @@ def scraper_article_bdm(url, session=None, verbose=False):
             if not legende:
                 legende = nettoyer_texte(img.get('alt', '')) or nettoyer_texte(img.get('title', ''))
             
-            # Éviter les doublons avec le thumbnail
-            if url_img != thumbnail:
-                images.append({
-                    "url": url_img,
-                    "caption": legende or ""
-                })
+            deja_vues.add(url_img)
+            images.append({
+                "url": url_img,
+                "caption": legende or ""
+            })
 
     # Construire le résultat final
     resultat = {
@@ -291,7 +618,7 @@ def scraper_article_bdm(url, session=None, verbose=False):
         "author": auteur or "",
         "content": contenu_texte,
         "images": images,
-        "scraped_at": datetime.utcnow().isoformat()
+        "scraped_at": datetime.now(timezone.utc).isoformat()
     }
 
     if verbose:
@@ -302,53 +629,264 @@ def scraper_article_bdm(url, session=None, verbose=False):
 
 #-------------------------------------------------------------------------------------------------------------------
 
+def scraper_article_bdm(url, session=None, verbose=False, ignorer_si_connu=False):
+    """
+    Scrape un article du Blog du Modérateur
+    Retourne toutes les infos demandées dans le TP
+    Sans session (session=None), la session partagée SESSION est utilisée
+    Avec ignorer_si_connu=True, retourne None sans rien télécharger si l'URL est déjà en base
+    """
+    session = session or SESSION
+    if ignorer_si_connu and url_deja_connue(url):
+        if verbose:
+            print(f"Déjà en base: {url}")
+        return None
+    
+    try:
+        # Timeout séparé (connexion, lecture) et corps lu en flux, plafonné
+        with session.get(url, headers=HEADERS, timeout=(5, 15), stream=True) as response:
+            response.raise_for_status()
+            contenu = lire_corps_limite(response)
+    except requests.RequestException as e:
+        if verbose:
+            print(f"Impossible de charger {url}: {e}")
+        return None
+    
+    # Sans charset dans l'en-tête, requests suppose ISO-8859-1: on laisse alors lxml
+    # lire le <meta charset> de la page
+    encodage = None
+    if "charset" in response.headers.get("Content-Type", "").lower():
+        encodage = response.encoding
+    
+    return analyser_article_bdm(contenu, response.url, encodage, verbose)
+
+#-------------------------------------------------------------------------------------------------------------------
+
+def lire_corps_limite(response, taille_max=TAILLE_MAX_PAGE):
+    """Lit le corps d'une réponse requests en flux, sans dépasser taille_max octets"""
+    morceaux = []
+    taille = 0
+    for morceau in response.iter_content(chunk_size=TAILLE_MORCEAU):
+        morceaux.append(morceau)
+        taille += len(morceau)
+        if taille >= taille_max:
+            break
+    return b"".join(morceaux)[:taille_max]
+
+#-------------------------------------------------------------------------------------------------------------------
+
+def scraper_dans_thread(url, verbose=False):
+    """Scrape un article avec la session propre au thread courant"""
+    session = getattr(_sessions_threads, "session", None)
+    if session is None:
+        session = _sessions_threads.session = creer_session()
+    return scraper_article_bdm(url, session=session, verbose=verbose)
+
+#-------------------------------------------------------------------------------------------------------------------
+
+def scraper_articles_batch(urls, max_workers=16, verbose=False, ignorer_si_connu=False):
+    """
+    Scrape plusieurs articles en parallèle avec un pool de threads
+    Retourne les articles dans l'ordre où ils sont terminés (échecs ignorés)
+    """
+    if ignorer_si_connu:
+        urls = [url for url in urls if not url_deja_connue(url)]
+
+    resultats = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(scraper_dans_thread, url, verbose): url for url in urls}
+        for future in as_completed(futures):
+            # Une page qui fait échouer l'analyse ne doit pas faire perdre les autres
+            try:
+                resultat = future.result()
+            except Exception as e:
+                if verbose:
+                    print(f"Erreur sur {futures[future]}: {e}")
+                continue
+            if resultat:
+                resultats.append(resultat)
+    return resultats
+
+#-------------------------------------------------------------------------------------------------------------------
+
+async def scraper_article_bdm_async(url, verbose=False):
+    """Version asynchrone de scraper_article_bdm: tout le travail se fait dans un thread"""
+    return await asyncio.to_thread(scraper_dans_thread, url, verbose)
+
+#-------------------------------------------------------------------------------------------------------------------
+
+async def telecharger_et_analyser(session, url, verbose=False):
+    """Télécharge un article avec aiohttp puis l'analyse dans un thread"""
+    try:
+        timeout = aiohttp.ClientTimeout(total=15, sock_connect=5)
+        async with session.get(url, timeout=timeout) as response:
+            response.raise_for_status()
+            morceaux = []
+            taille = 0
+            async for morceau in response.content.iter_chunked(TAILLE_MORCEAU):
+                morceaux.append(morceau)
+                taille += len(morceau)
+                if taille >= TAILLE_MAX_PAGE:
+                    break
+            contenu = b"".join(morceaux)[:TAILLE_MAX_PAGE]
+            encodage = response.charset
+            base_url = str(response.url)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        if verbose:
+            print(f"Impossible de charger {url}: {e}")
+        return None
+
+    # Le parsing est du calcul: on le sort de la boucle d'événements
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, analyser_article_bdm, contenu, base_url, encodage, verbose)
+
+#-------------------------------------------------------------------------------------------------------------------
+
+async def scraper_articles_async(urls, concurrence=50, verbose=False, ignorer_si_connu=False):
+    """
+    Scrape plusieurs articles en parallèle avec une seule session aiohttp
+    Retourne les résultats dans l'ordre des URLs (None pour les échecs et,
+    avec ignorer_si_connu=True, pour les URLs déjà en base)
+    """
+    if aiohttp is None:
+        raise ImportError("aiohttp est nécessaire pour scraper_articles_async")
+
+    semaphore = asyncio.Semaphore(concurrence)
+    if ignorer_si_connu:
+        # Lecture complète de la collection au premier appel: dans un thread, pour ne pas
+        # bloquer la boucle d'événements (url_deja_connue ne lit ensuite que l'ensemble)
+        await asyncio.to_thread(urls_connues)
+
+    async def scraper_borne(session, url):
+        if ignorer_si_connu and url_deja_connue(url):
+            return None
+        async with semaphore:
+            # Une page qui fait échouer l'analyse ne doit pas faire perdre les autres
+            try:
+                return await telecharger_et_analyser(session, url, verbose)
+            except Exception as e:
+                if verbose:
+                    print(f"Erreur sur {url}: {e}")
+                return None
+
+    connecteur = aiohttp.TCPConnector(limit=concurrence, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connecteur, headers=HEADERS) as session:
+        return await asyncio.gather(*(scraper_borne(session, url) for url in urls))
+
+#-------------------------------------------------------------------------------------------------------------------
+
 def sauvegarder_en_base(article):
-    """Sauvegarde un article dans MongoDB"""
+    """
+    Sauvegarde un article dans MongoDB (lot d'un seul article)
+    Retourne un UpdateResult, comme update_one (upserted_id, matched_count...)
+    """
     if not article or not article.get("url"):
         raise ValueError("L'article doit avoir une URL pour être sauvegardé")
     
+    resultat = sauvegarder_articles_en_masse([article])[0]
+    if not resultat.acknowledged:  # écriture non acquittée: pas de compteurs
+        return UpdateResult(None, False)
+    return UpdateResult({
+        "n": resultat.matched_count + resultat.upserted_count,
+        "nModified": resultat.modified_count,
+        "upserted": resultat.upserted_ids.get(0),
+    }, resultat.acknowledged)
+
+#-------------------------------------------------------------------------------------------------------------------
+
+def sauvegarder_articles_en_masse(articles, taille_lot=500):
+    """
+    Sauvegarde plusieurs articles dans MongoDB par lots (un bulk_write par lot)
+    Les articles vides ou sans URL sont ignorés
+    """
+    articles = [article for article in articles if article and article.get("url")]
+    creer_index()
+
+    resultats = []
     try:
-        resultat = articles_col.update_one(
-            {"url": article["url"]},
-            {"$set": article},
-            upsert=True
-        )
-        return resultat
+        for debut in range(0, len(articles), taille_lot):
+            lot = articles[debut:debut + taille_lot]
+            operations = [
+                UpdateOne({"url": article["url"]}, {"$set": article}, upsert=True)
+                for article in lot
+            ]
+            resultats.append(articles_col.bulk_write(operations, ordered=False))
+            if _urls_connues is not None:
+                _urls_connues.update(article["url"] for article in lot)
+        return resultats
     except Exception as e:
-        print(f"Erreur lors de la sauvegarde: {e}")
+        print(f"Erreur lors de la sauvegarde en masse: {e}")
         raise
 
 #-------------------------------------------------------------------------------------------------------------------
 
-def chercher_articles_par_categorie(categorie=None, sous_categorie=None, limite=100):
-    """Trouve les articles d'une catégorie ou sous-catégorie"""
+def parcourir_curseur(cursor, message_erreur):
+    """
+    Parcourt un curseur MongoDB document par document
+    La requête ne part qu'à la première lecture: une erreur serveur est affichée et
+    arrête le parcours; le curseur est fermé même si l'appelant s'arrête avant la fin
+    """
+    try:
+        yield from cursor
+    except Exception as e:
+        print(f"{message_erreur}: {e}")
+    finally:
+        cursor.close()
+
+#-------------------------------------------------------------------------------------------------------------------
+
+def chercher_articles_par_categorie(categorie=None, sous_categorie=None, limite=100,
+                                    projection=PROJECTION_LEGERE):
+    """
+    Trouve les articles d'une catégorie ou sous-catégorie
+    Le contenu et les images ne sont renvoyés que si projection=None
+    Renvoie un itérateur paresseux (list(...) pour tout charger)
+    """
     requete = {}
     
+    # Égalité + collation insensible à la casse: la recherche passe par l'index
     if categorie:
-        requete["subcategory"] = {"$regex": f"^{re.escape(categorie)}$", "$options": "i"}
+        requete["subcategory"] = categorie
     
     if sous_categorie:
-        requete["subcategory"] = {"$regex": f"^{re.escape(sous_categorie)}$", "$options": "i"}
+        requete["subcategory"] = sous_categorie
 
-    try:
-        cursor = articles_col.find(requete).limit(limite).sort("scraped_at", -1)
-        return list(cursor)
-    except Exception as e:
-        print(f"Erreur lors de la recherche: {e}")
-        return []
+    creer_index()
+    # Un seul lot réseau dimensionné sur la limite
+    cursor = articles_col.find(requete, projection).collation(COLLATION_FR).limit(limite).sort("scraped_at", -1)
+    return parcourir_curseur(cursor.batch_size(limite), "Erreur lors de la recherche")
+
+#-------------------------------------------------------------------------------------------------------------------
+
+@lru_cache(maxsize=512)
+def filtre_contient(texte):
+    """Filtre MongoDB "contient texte", insensible à la casse (mis en cache)"""
+    return {"$regex": re.escape(texte), "$options": "i"}
 
 #-------------------------------------------------------------------------------------------------------------------
 
 def recherche_avancee(titre_contient=None, auteur=None, date_debut=None, date_fin=None, 
-                     categorie=None, sous_categorie=None, limite=100):
-    """Recherche avancée dans les articles"""
+                     categorie=None, sous_categorie=None, limite=100, projection=PROJECTION_LEGERE):
+    """
+    Recherche avancée dans les articles
+    titre_contient passe par l'index texte (mots du titre ou du contenu, triés par
+    pertinence); en dessous de 2 caractères, simple recherche dans le titre
+    Le contenu et les images ne sont renvoyés que si projection=None
+    Renvoie un itérateur paresseux (list(...) pour tout charger)
+    """
     requete = {}
+    tri = [("date", DESCENDING)]
     
-    if titre_contient:
-        requete["title"] = {"$regex": re.escape(titre_contient), "$options": "i"}
+    if titre_contient and len(titre_contient.strip()) >= 2:
+        requete["$text"] = {"$search": titre_contient}
+        projection = dict(projection or {}, score={"$meta": "textScore"})
+        tri.insert(0, ("score", {"$meta": "textScore"}))
+    elif titre_contient:
+        requete["title"] = filtre_contient(titre_contient)
     
+    # Égalité + collation insensible à la casse pour les champs exacts (index utilisable)
     if auteur:
-        requete["author"] = {"$regex": re.escape(auteur), "$options": "i"}
+        requete["author"] = auteur
     
     if date_debut or date_fin:
         date_requete = {}
@@ -359,18 +897,16 @@ def recherche_avancee(titre_contient=None, auteur=None, date_debut=None, date_fi
         requete["date"] = date_requete
     
     if sous_categorie:
-        requete["subcategory"] = {"$regex": re.escape(sous_categorie), "$options": "i"}
+        requete["subcategory"] = sous_categorie
 
-    try:
-        cursor = articles_col.find(requete).limit(limite).sort("date", -1)
-        return list(cursor)
-    except Exception as e:
-        print(f"Erreur dans la recherche: {e}")
-        return []
+    creer_index()  # $text exige l'index texte
+    cursor = articles_col.find(requete, projection).collation(COLLATION_FR).limit(limite).sort(tri)
+    return parcourir_curseur(cursor.batch_size(limite), "Erreur dans la recherche")
 
 # Test du script
 if __name__ == "__main__":
     print("Test du scraper avec le Blog du Modérateur")
+    creer_index()
     
     url_test = "https://www.blogdumoderateur.com/100-outils-ia-plus-utilises-monde-ete-2025/"
     
@@ -397,7 +933,7 @@ if __name__ == "__main__":
         
         # Tester la recherche
         print(f"\n🔍 Test recherche par catégorie '{donnees['subcategory']}':")
-        articles_trouves = chercher_articles_par_categorie(sous_categorie=donnees['subcategory'])
+        articles_trouves = list(chercher_articles_par_categorie(sous_categorie=donnees['subcategory']))
         print(f"Trouvé {len(articles_trouves)} articles")
         
         for article in articles_trouves[:3]:
@@ -0,0 +1,39 @@
+"""
+Conversion des dates de publication au format AAAAMMJJ
+"""
+
+import pytest
+
+from bdm_scraper import convertir_date_francaise
+
+
+@pytest.mark.parametrize("texte, attendu", [
+    ("12 mars 2024", "20240312"),
+    ("2024-03-12T10:00:00+00:00", "20240312"),
+    ("1er janvier 2024", "20240101"),
+    ("March 3, 2024", "20240303"),
+    ("15/03/2024", "20240315"),
+    ("15.03.2024", "20240315"),
+    ("15-03-2024", "20240315"),
+    ("2024/3/5", "20240305"),
+    ("03/25/2024", "20240325"),
+    ("29/02/2024", "20240229"),
+    ("Publié le 15/03/2024 à 10h", "20240315"),
+])
+def test_dates_reconnues(texte, attendu):
+    assert convertir_date_francaise(texte) == attendu
+
+
+@pytest.mark.parametrize("texte", [
+    None,
+    "",
+    "31/13/2024",
+    "0/0/2024",
+    "2024/13/45",
+    "30/02/2024",
+    "29/02/2023",
+    "15/03-2024",
+    "10 outils 2025",
+])
+def test_dates_invalides(texte):
+    assert convertir_date_francaise(texte) is None
@@ -0,0 +1,43 @@
+"""
+Petites fonctions utilitaires: attributs numériques et URLs déjà en base
+"""
+
+import pytest
+
+import bdm_scraper
+from bdm_scraper import en_entier, url_deja_connue
+
+
+@pytest.mark.parametrize("valeur, attendu", [
+    ("300", 300),
+    (" 300 ", 300),
+    ("100%", None),
+    ("", None),
+    (None, None),
+])
+def test_en_entier(valeur, attendu):
+    assert en_entier(valeur) == attendu
+
+
+@pytest.fixture
+def urls_en_base(monkeypatch):
+    # Ensemble déjà chargé: urls_connues() ne contacte pas MongoDB
+    monkeypatch.setattr(bdm_scraper, "_urls_connues", {
+        "https://www.blogdumoderateur.com/article/",
+        "https://www.blogdumoderateur.com/page?x=1",
+    })
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.blogdumoderateur.com/article/",
+    "https://www.blogdumoderateur.com/article",
+    "http://www.blogdumoderateur.com/article/",
+    "http://www.blogdumoderateur.com/article",
+    "http://www.blogdumoderateur.com/page?x=1",
+])
+def test_url_deja_connue_variantes(urls_en_base, url):
+    assert url_deja_connue(url)
+
+
+def test_url_inconnue(urls_en_base):
+    assert not url_deja_connue("https://www.blogdumoderateur.com/autre/")
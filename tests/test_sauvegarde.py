@@ -0,0 +1,61 @@
+"""
+sauvegarder_en_base renvoie un UpdateResult, comme update_one
+(bulk_write simulé: pas de MongoDB nécessaire)
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+from pymongo.results import BulkWriteResult
+
+import bdm_scraper
+from bdm_scraper import sauvegarder_en_base
+
+
+def collection_simulee(monkeypatch, resultat_brut, acquitte=True):
+    collection = MagicMock()
+    collection.bulk_write.return_value = BulkWriteResult(resultat_brut, acquitte)
+    monkeypatch.setattr(bdm_scraper, "articles_col", collection)
+    monkeypatch.setattr(bdm_scraper, "_index_crees", True)
+    return collection
+
+
+def test_insertion(monkeypatch):
+    collection = collection_simulee(monkeypatch, {
+        "nInserted": 0, "nUpserted": 1, "nMatched": 0, "nModified": 0, "nRemoved": 0,
+        "upserted": [{"index": 0, "_id": "id-nouveau"}],
+    })
+
+    resultat = sauvegarder_en_base({"url": "https://x/article/", "title": "Titre"})
+
+    assert resultat.acknowledged
+    assert resultat.upserted_id == "id-nouveau"
+    assert resultat.matched_count == 0
+    assert resultat.modified_count == 0
+    collection.bulk_write.assert_called_once()
+
+
+def test_mise_a_jour(monkeypatch):
+    collection_simulee(monkeypatch, {
+        "nInserted": 0, "nUpserted": 0, "nMatched": 1, "nModified": 1, "nRemoved": 0,
+        "upserted": [],
+    })
+
+    resultat = sauvegarder_en_base({"url": "https://x/article/", "title": "Titre"})
+
+    assert resultat.upserted_id is None
+    assert resultat.matched_count == 1
+    assert resultat.modified_count == 1
+
+
+def test_ecriture_non_acquittee(monkeypatch):
+    collection_simulee(monkeypatch, {}, acquitte=False)
+
+    resultat = sauvegarder_en_base({"url": "https://x/article/"})
+
+    assert not resultat.acknowledged
+
+
+def test_article_sans_url():
+    with pytest.raises(ValueError):
+        sauvegarder_en_base({"title": "Sans URL"})
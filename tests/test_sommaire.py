@@ -0,0 +1,36 @@
+"""
+Détection du sommaire par analyser_article_bdm
+"""
+
+from bdm_scraper import analyser_article_bdm
+
+URL = "https://www.blogdumoderateur.com/test/"
+
+PAGE_SOMMAIRE_IMBRIQUE = """<html><head><meta charset="utf-8"></head><body>
+<article>
+  <div class="toc">Sommaire
+    <ul><li>Partie une</li><li>Partie deux</li></ul>
+  </div>
+  <p>Premier paragraphe de l'article, assez long pour être gardé.</p>
+</article>
+<footer><ul><li>Footer link item</li></ul></footer>
+</body></html>"""
+
+PAGE_SOMMAIRE_TITRE = """<html><head><meta charset="utf-8"></head><body>
+<article>
+  <h2>Sommaire</h2>
+  <ol><li>Introduction</li><li>Conclusion</li></ol>
+  <p>Premier paragraphe de l'article, assez long pour être gardé.</p>
+</article>
+<footer><ul><li>Footer link item</li></ul></footer>
+</body></html>"""
+
+
+def test_sommaire_liste_dans_la_div():
+    article = analyser_article_bdm(PAGE_SOMMAIRE_IMBRIQUE.encode("utf-8"), URL)
+    assert article["sommaire"] == ["Partie une", "Partie deux"]
+
+
+def test_sommaire_liste_apres_le_titre():
+    article = analyser_article_bdm(PAGE_SOMMAIRE_TITRE.encode("utf-8"), URL)
+    assert article["sommaire"] == ["Introduction", "Conclusion"]